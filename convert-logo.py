@@ -6,8 +6,11 @@ This script converts the React TSX logo component to a PNG image.
 
 import json
 import base64
+import os
+from functools import lru_cache
 from pathlib import Path
 
+@lru_cache(maxsize=1)
 def create_svg_logo():
     """Create an SVG version of the Prestige AI logo that can be easily converted to PNG"""
     
@@ -85,6 +88,16 @@ def create_svg_logo():
     
     return svg_content
 
+def atomic_write(path, write):
+    """Call write() on a temp path, then rename it over path in one step"""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
 def save_logo_files():
     """Save both SVG and provide instructions for PNG conversion"""
     
@@ -93,8 +106,7 @@ def save_logo_files():
     
     # Save SVG file
     svg_path = Path('prestige-ai-logo.svg')
-    with open(svg_path, 'w', encoding='utf-8') as f:
-        f.write(svg_content)
+    atomic_write(svg_path, lambda tmp: tmp.write_text(svg_content, encoding='utf-8'))
     
     print("✅ SVG logo created successfully!")
     print(f"📁 Saved as: {svg_path.absolute()}")
@@ -129,8 +141,7 @@ def save_logo_files():
 - Features: Animated dots, noise texture, XML tag, crown with gems
 """
     
-    with open('logo-conversion-instructions.md', 'w') as f:
-        f.write(instructions)
+    atomic_write('logo-conversion-instructions.md', lambda tmp: tmp.write_text(instructions))
     
     print("📋 Conversion instructions saved as: logo-conversion-instructions.md")
     
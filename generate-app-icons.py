@@ -4,28 +4,63 @@ Prestige AI App Icon Generator
 Converts SVG logo to all required app icon formats and sizes
 """
 
+import hashlib
+import importlib.util
+import io
 import os
-import subprocess
-import sys
+import shutil
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
+from queue import Queue
+from threading import Thread
+from xml.etree import ElementTree
+
+MASTER_SIZE = 1024
+CACHE_DIR = Path('icons/.cache')
+# Bump whenever the rendering pipeline changes output for the same SVG
+RENDER_PIPELINE_VERSION = 2
+PNG_COMPRESS_LEVEL = 6
+
+# Small icons are rendered straight from the SVG at their target size
+DIRECT_RENDER_SIZES = {16, 32, 48, 64, 128}
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+
+# Markup that only matters for the live SVG: the animated dots and the
+# per-pixel feTurbulence noise overlay, which is costly to rasterize
+RASTER_ONLY_TAGS = {f'{{{SVG_NS}}}animate'}
+RASTER_ONLY_FILTER_ID = 'noiseFilter'
+
+# ICNS element types by the pixel size they store, matching the set iconutil
+# emits: PNG payloads for 32px and up, RLE-packed ARGB for the 1x 16/32 slots
+ICNS_PNG_TYPES = {
+    32: [b'ic11'],
+    64: [b'ic12'],
+    128: [b'ic07'],
+    256: [b'ic13', b'ic08'],
+    512: [b'ic14', b'ic09'],
+    1024: [b'ic10'],
+}
+ICNS_ARGB_TYPES = {
+    16: b'ic04',
+    32: b'ic05',
+}
 
 def check_dependencies():
     """Check if required tools are installed"""
-    required_tools = {
-        'magick': 'ImageMagick (brew install imagemagick)',
-        'iconutil': 'macOS iconutil (built-in on macOS)',
+    required_modules = {
+        'PIL': 'Pillow (pip install Pillow)',
+        'resvg_py': 'resvg-py (pip install resvg-py)',
     }
     
     missing = []
-    for tool, install_info in required_tools.items():
-        try:
-            subprocess.run([tool, '--version'], capture_output=True, check=True)
-            print(f"✅ {tool} is available")
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            if tool == 'iconutil' and sys.platform != 'darwin':
-                print(f"ℹ️  {tool} not available (not on macOS)")
-            else:
-                missing.append(f"{tool} - Install: {install_info}")
+    for module, install_info in required_modules.items():
+        if importlib.util.find_spec(module) is not None:
+            print(f"✅ {module} is available")
+        else:
+            missing.append(f"{module} - Install: {install_info}")
     
     if missing:
         print("\n❌ Missing required tools:")
@@ -41,6 +76,127 @@ def create_directories():
     for dir_name in dirs:
         Path(dir_name).mkdir(exist_ok=True)
 
+def svg_content_hash(svg_file):
+    """Hash the SVG bytes and render settings so cached output tracks both"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(Path(svg_file).read_bytes())
+    render_settings = (
+        RENDER_PIPELINE_VERSION,
+        MASTER_SIZE,
+        PNG_COMPRESS_LEVEL,
+        sorted(DIRECT_RENDER_SIZES),
+        sorted(RASTER_ONLY_TAGS),
+        RASTER_ONLY_FILTER_ID,
+    )
+    digest.update(repr(render_settings).encode('utf-8'))
+    return digest.hexdigest()
+
+def atomic_write(path, write):
+    """Call write() on a temp path, then rename it over path in one step"""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def link_or_copy(source, dest):
+    """Hardlink source to dest, falling back to a copy across filesystems"""
+    def write(tmp):
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+    
+    atomic_write(dest, write)
+
+def prune_icon_cache(keep_hash):
+    """Remove cached renders of previous SVG versions"""
+    for entry in CACHE_DIR.iterdir():
+        if entry.is_dir() and entry.name != keep_hash:
+            shutil.rmtree(entry, ignore_errors=True)
+
+def strip_raster_only_elements(svg_data):
+    """Drop animation and noise-filter markup that a static PNG cannot use"""
+    ElementTree.register_namespace('', SVG_NS)
+    ElementTree.register_namespace('xlink', 'http://www.w3.org/1999/xlink')
+    root = ElementTree.fromstring(svg_data)
+    
+    filter_ref = f'url(#{RASTER_ONLY_FILTER_ID})'
+    for parent in list(root.iter()):
+        for child in list(parent):
+            if (
+                child.tag in RASTER_ONLY_TAGS
+                or child.get('id') == RASTER_ONLY_FILTER_ID
+                or child.get('filter', '').replace(' ', '') == filter_ref
+            ):
+                parent.remove(child)
+    
+    return ElementTree.tostring(root, encoding='unicode')
+
+def render_svg_png(svg_data, size):
+    """Render SVG markup straight to encoded PNG bytes at the given square size"""
+    import resvg_py
+    
+    return bytes(resvg_py.svg_to_bytes(svg_string=svg_data, width=size, height=size))
+
+def rasterize_svg(svg_data, size):
+    """Render SVG markup to an RGBA image at the given square size"""
+    from PIL import Image
+    
+    return Image.open(io.BytesIO(render_svg_png(svg_data, size))).convert('RGBA')
+
+def load_cached_master(cache_dir):
+    """Return the cached full-size render for this SVG hash, if there is one"""
+    from PIL import Image
+    
+    master_file = cache_dir / f'icon-{MASTER_SIZE}.png'
+    if not master_file.exists():
+        return None
+    try:
+        with Image.open(master_file) as image:
+            return image.convert('RGBA')
+    except OSError:
+        # A corrupt cache entry is a miss; drop it so it gets re-rendered
+        master_file.unlink(missing_ok=True)
+        return None
+
+def save_resampled_sizes(master, sizes, cache_dir):
+    """Resample each size while a writer thread PNG-encodes the previous one"""
+    from PIL import Image
+    
+    pending = Queue(maxsize=2)
+    errors = {}
+    
+    def writer():
+        while (item := pending.get()) is not None:
+            size, image = item
+            try:
+                atomic_write(
+                    cache_dir / f'icon-{size}.png',
+                    lambda tmp: image.save(tmp, format='PNG', compress_level=PNG_COMPRESS_LEVEL),
+                )
+            except Exception as e:
+                errors[size] = e
+    
+    thread = Thread(target=writer)
+    thread.start()
+    try:
+        for size in sizes:
+            try:
+                image = master if size == MASTER_SIZE else master.resize((size, size), Image.LANCZOS)
+            except Exception as e:
+                errors[size] = e
+                continue
+            pending.put((size, image))
+    finally:
+        pending.put(None)
+        thread.join()
+    
+    return errors
+
 def generate_png_sizes():
     """Generate PNG files at all required sizes"""
     sizes = [16, 32, 48, 64, 128, 256, 512, 1024]
@@ -52,69 +208,155 @@ def generate_png_sizes():
     
     print("🔄 Generating PNG files...")
     
-    for size in sizes:
-        output_file = f"icons/png/icon-{size}x{size}.png"
+    svg_hash = svg_content_hash(svg_file)
+    cache_dir = CACHE_DIR / svg_hash
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    prune_icon_cache(svg_hash)
+    
+    # Cache entries are written atomically, so an existing file is a complete render
+    missing = [size for size in sizes if not (cache_dir / f'icon-{size}.png').exists()]
+    
+    if missing:
+        try:
+            svg_data = strip_raster_only_elements(Path(svg_file).read_text(encoding='utf-8'))
+        except ElementTree.ParseError as e:
+            print(f"❌ Failed to parse {svg_file}: {e}")
+            return False
+        resampled = [size for size in missing if size not in DIRECT_RENDER_SIZES]
+        
+        # Rasterize the SVG once at full size for the sizes that are downsampled,
+        # reusing the cached full-size render when only smaller sizes are missing
+        master = None
+        if resampled:
+            master = load_cached_master(cache_dir)
+            if master is None:
+                # The cached render was absent or corrupt, so it is rewritten too
+                if MASTER_SIZE not in missing:
+                    missing.append(MASTER_SIZE)
+                    resampled.append(MASTER_SIZE)
+                try:
+                    master = rasterize_svg(svg_data, MASTER_SIZE)
+                except Exception as e:
+                    print(f"❌ Failed to rasterize {svg_file}: {e}")
+                    return False
         
-        # Use ImageMagick to convert SVG to PNG at specific size
-        cmd = [
-            'magick',
-            '-background', 'none',
-            '-size', f'{size}x{size}',
-            svg_file,
-            output_file
-        ]
+        direct = [size for size in missing if size in DIRECT_RENDER_SIZES]
         
+        def render_direct(size):
+            png = render_svg_png(svg_data, size)
+            atomic_write(cache_dir / f'icon-{size}.png', lambda tmp: tmp.write_bytes(png))
+        
+        # Small sizes render on the pool while this thread feeds the resample/encode pipeline
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(len(direct), os.cpu_count() or 1))) as executor:
+            futures = {size: executor.submit(render_direct, size) for size in direct}
+            if resampled:
+                errors.update(save_resampled_sizes(master, resampled, cache_dir))
+        
+        for size, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[size] = e
+        
+        for size in missing:
+            if size in errors:
+                print(f"❌ Failed to generate icons/png/icon-{size}x{size}.png: {errors[size]}")
+                return False
+    
+    for size in sizes:
+        output_file = f"icons/png/icon-{size}x{size}.png"
         try:
-            subprocess.run(cmd, check=True, capture_output=True)
-            print(f"✅ Generated {output_file}")
-        except subprocess.CalledProcessError as e:
+            link_or_copy(cache_dir / f'icon-{size}.png', output_file)
+        except OSError as e:
             print(f"❌ Failed to generate {output_file}: {e}")
             return False
+        status = "Generated" if size in missing else "Reused cached"
+        print(f"✅ {status} {output_file}")
     
     return True
 
+def icns_rle(channel):
+    """Pack one ARGB channel with the icns run-length scheme"""
+    packed = bytearray()
+    i = 0
+    while i < len(channel):
+        run = 1
+        while i + run < len(channel) and run < 130 and channel[i + run] == channel[i]:
+            run += 1
+        if run >= 3:
+            packed += bytes((0x80 + run - 3, channel[i]))
+            i += run
+            continue
+        # Literal span until the next run of three or the 128-byte limit
+        start = i
+        while i < len(channel) and i - start < 128:
+            if i + 2 < len(channel) and channel[i] == channel[i + 1] == channel[i + 2]:
+                break
+            i += 1
+        packed.append(i - start - 1)
+        packed += channel[start:i]
+    return bytes(packed)
+
+def encode_icns_argb(png_file):
+    """Convert a PNG into the 'ARGB' payload used by the ic04/ic05 slots"""
+    from PIL import Image
+    
+    with Image.open(png_file) as image:
+        red, green, blue, alpha = image.convert('RGBA').split()
+    return b'ARGB' + b''.join(icns_rle(band.tobytes()) for band in (alpha, red, green, blue))
+
+def write_icns(output_file, payloads):
+    """Write element payloads into an .icns container, keyed by ICNS element type"""
+    elements = b''.join(
+        type_code + struct.pack('>I', 8 + len(payload)) + payload
+        for type_code, payload in payloads.items()
+    )
+    data = b'icns' + struct.pack('>I', 8 + len(elements)) + elements
+    atomic_write(output_file, lambda tmp: tmp.write_bytes(data))
+
 def create_icns_file():
     """Create macOS .icns file"""
-    if sys.platform != 'darwin':
-        print("ℹ️  Skipping .icns creation (not on macOS)")
-        return True
-    
-    # Create iconset directory
-    iconset_dir = 'icons/prestige-ai.iconset'
-    Path(iconset_dir).mkdir(exist_ok=True)
-    
-    # Copy PNG files to iconset with proper naming
-    icon_mappings = {
-        16: ['icon_16x16.png'],
-        32: ['icon_16x16@2x.png', 'icon_32x32.png'],
-        64: ['icon_32x32@2x.png'],
-        128: ['icon_128x128.png'],
-        256: ['icon_128x128@2x.png', 'icon_256x256.png'],
-        512: ['icon_256x256@2x.png', 'icon_512x512.png'],
-        1024: ['icon_512x512@2x.png']
-    }
-    
     print("🔄 Creating .icns file...")
     
-    for size, filenames in icon_mappings.items():
-        source = f'icons/png/icon-{size}x{size}.png'
-        if Path(source).exists():
-            for filename in filenames:
-                dest = f'{iconset_dir}/{filename}'
-                subprocess.run(['cp', source, dest], check=True)
-    
-    # Generate .icns file
     try:
-        subprocess.run(['iconutil', '-c', 'icns', iconset_dir], check=True)
-        print("✅ Generated icons/prestige-ai.icns")
+        payloads = {}
+        for size, type_code in ICNS_ARGB_TYPES.items():
+            source = Path(f'icons/png/icon-{size}x{size}.png')
+            if source.exists():
+                payloads[type_code] = encode_icns_argb(source)
+        for size, type_codes in ICNS_PNG_TYPES.items():
+            source = Path(f'icons/png/icon-{size}x{size}.png')
+            if source.exists():
+                png = source.read_bytes()
+                for type_code in type_codes:
+                    payloads[type_code] = png
         
-        # Clean up iconset directory
-        subprocess.run(['rm', '-rf', iconset_dir], check=True)
+        if not payloads:
+            print("❌ No PNG files found for .icns creation")
+            return False
+        
+        write_icns('icons/prestige-ai.icns', payloads)
+        print("✅ Generated icons/prestige-ai.icns")
         return True
-    except subprocess.CalledProcessError as e:
+    except OSError as e:
         print(f"❌ Failed to create .icns file: {e}")
         return False
 
+def write_ico(png_files, output_file):
+    """Bundle PNG files into a single .ico container with Pillow"""
+    from PIL import Image
+    
+    with ExitStack() as stack:
+        images = [stack.enter_context(Image.open(f)) for f in png_files]
+        largest = max(images, key=lambda image: image.width)
+        atomic_write(output_file, lambda tmp: largest.save(
+            tmp,
+            format='ICO',
+            sizes=[image.size for image in images],
+            append_images=[image for image in images if image is not largest],
+        ))
+
 def create_ico_file():
     """Create Windows .ico file"""
     ico_sizes = [16, 32, 48, 64, 128, 256]
@@ -130,11 +372,10 @@ def create_ico_file():
     print("🔄 Creating .ico file...")
     
     try:
-        cmd = ['magick'] + existing_files + ['icons/prestige-ai.ico']
-        subprocess.run(cmd, check=True, capture_output=True)
+        write_ico(existing_files, 'icons/prestige-ai.ico')
         print("✅ Generated icons/prestige-ai.ico")
         return True
-    except subprocess.CalledProcessError as e:
+    except OSError as e:
         print(f"❌ Failed to create .ico file: {e}")
         return False
 
@@ -142,25 +383,29 @@ def create_favicon_files():
     """Create favicon files for web usage"""
     print("🔄 Creating favicon files...")
     
-    # Copy standard sizes for favicon
-    favicon_mappings = {
-        'icons/png/icon-32x32.png': 'favicon-32x32.png',
-        'icons/png/icon-16x16.png': 'favicon-16x16.png',
-        'icons/png/icon-32x32.png': 'favicon.png'
-    }
+    # Hardlink standard sizes for favicon; a list, since one source feeds two outputs
+    favicon_mappings = [
+        ('icons/png/icon-32x32.png', 'favicon-32x32.png'),
+        ('icons/png/icon-16x16.png', 'favicon-16x16.png'),
+        ('icons/png/icon-32x32.png', 'favicon.png'),
+    ]
     
-    for source, dest in favicon_mappings.items():
-        if Path(source).exists():
-            subprocess.run(['cp', source, dest], check=True)
+    for source, dest in favicon_mappings:
+        if not Path(source).exists():
+            print(f"❌ Skipped {dest}: {source} not found")
+            continue
+        try:
+            link_or_copy(source, dest)
             print(f"✅ Generated {dest}")
+        except OSError as e:
+            print(f"❌ Failed to create {dest}: {e}")
     
     # Create favicon.ico from 16x16 and 32x32
     if Path('icons/png/icon-16x16.png').exists() and Path('icons/png/icon-32x32.png').exists():
         try:
-            cmd = ['magick', 'icons/png/icon-16x16.png', 'icons/png/icon-32x32.png', 'favicon.ico']
-            subprocess.run(cmd, check=True, capture_output=True)
+            write_ico(['icons/png/icon-16x16.png', 'icons/png/icon-32x32.png'], 'favicon.ico')
             print("✅ Generated favicon.ico")
-        except subprocess.CalledProcessError as e:
+        except OSError as e:
             print(f"❌ Failed to create favicon.ico: {e}")
 
 def update_electron_config():
@@ -197,8 +442,7 @@ def update_electron_config():
 }
 '''
     
-    with open('electron-build-config.txt', 'w') as f:
-        f.write(package_json_updates)
+    atomic_write('electron-build-config.txt', lambda tmp: tmp.write_text(package_json_updates))
     
     print("✅ Created electron-build-config.txt with build configuration")
 